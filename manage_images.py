@@ -9,8 +9,20 @@ import os
 import subprocess
 import sys
 import argparse
+import contextlib
+import json
+import re
+import shutil
 import pwd
 import grp
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache, partial
+
+try:
+    import docker
+except ImportError:
+    docker = None
 
 # Compiler metadata: maps compiler to ubuntu_version
 COMPILER_METADATA = {
@@ -40,7 +52,30 @@ COMPILER_METADATA = {
     'gcc-14':   '24.04',
 }
 
-SUPPORTED_COMPILERS = list(COMPILER_METADATA.keys()) + ['all']
+# The runtime commands identified by the previous runs (e.g. whether sudo is needed)
+RUNTIME_CACHE = os.path.join(os.environ.get('XDG_CACHE_HOME') or os.path.expanduser('~/.cache'),
+                             'fuzzer-build-containers', 'runtime')
+
+# The default Docker daemon socket
+DOCKER_SOCKET = '/var/run/docker.sock'
+
+# Docker's tag-to-ID map for the overlay2 storage driver, readable only by root
+DOCKER_REPOSITORIES = '/var/lib/docker/image/overlay2/repositories.json'
+
+# The fuzzer images and the base and cache images shared by them
+IMAGE_REPOSITORIES = ('fuzzer-build-container', 'fuzzer-build-cache', 'fuzzer-build-base')
+
+# The host user and group IDs, host_names() gets the names when they are needed
+_UID = os.getuid()
+_GID = os.getgid()
+
+# A dict keeps the order of COMPILER_METADATA in the help and the argparse errors
+SUPPORTED_COMPILERS = {**dict.fromkeys(COMPILER_METADATA), 'all': None}
+_SUPPORTED_HELP = ' / '.join(SUPPORTED_COMPILERS)
+
+# ContainerImage class attributes passed to the parallel build workers
+WORKER_ATTRS = ('runtime', 'runtime_cmd', 'quiet', 'fuzzer_name', 'additional_deps',
+                'cache_registry', '_common_build_args', '_tag_prefix')
 
 
 class ContainerImage:
@@ -53,6 +88,8 @@ class ContainerImage:
         quiet (bool): quiet mode for hiding the container image build log
         fuzzer_name (str): name of the fuzzer
         additional_deps (str): additional apt packages to install
+        cache_registry (str): registry repository holding the '<compiler>-cache' images
+        client (docker.DockerClient): Docker SDK client, None if the CLI is used
 
     Instance Attributes:
         compiler (str): compiler identifier (e.g., 'gcc-12', 'clang-15')
@@ -60,6 +97,8 @@ class ContainerImage:
         compiler_version (str): version number of the compiler
         ubuntu (str): Ubuntu version
         tag (str): container image tag
+        cache_tag (str): tag of the fuzzer-independent 'compiler' stage image
+        log_path (str): build log file for the quiet mode and parallel builds
         id (str): container image ID
     """
 
@@ -68,122 +107,458 @@ class ContainerImage:
     quiet = False
     fuzzer_name = None
     additional_deps = None
+    cache_registry = None
+    client = None
+    _common_build_args = {}
+    _tag_prefix = None
+    _id_cache = None
+    _containers_by_image = None
+    _repositories_trusted = None
 
     def __init__(self, compiler):
         if compiler not in COMPILER_METADATA:
             sys.exit(f'[-] ERROR: Unknown compiler "{compiler}"')
 
-        if not ContainerImage.runtime_cmd:
-            ContainerImage.runtime_cmd = self.identify_runtime_cmd()
+        ensure_runtime_cmd()
 
         self.compiler = compiler
         self.compiler_type, self.compiler_version = compiler.split('-', 1)
         self.ubuntu = COMPILER_METADATA[compiler]
-        self.tag = f'fuzzer-build-container:{ContainerImage.fuzzer_name}-{self.compiler}'
-        self.id = self.find_id()
-
-    def build(self):
-        """Build a container image for the specified compiler"""
+        self.tag = ContainerImage._tag_prefix + compiler
+        self.cache_tag = f'fuzzer-build-cache:{self.compiler}'
+        self.log_path = f'build-{ContainerImage.fuzzer_name}-{self.compiler}.log'
+        if ContainerImage._id_cache is None:
+            ContainerImage._load_id_cache()
+        self.id = ContainerImage._id_cache.get(self.tag, '')
+
+    def build(self, to_log=False):
+        """Build a container image for the specified compiler, optionally writing the output to log_path"""
         if self.id:
             print(f'\nThe container image for {self.fuzzer_name}-{self.compiler} exists: {self.id}')
             return
 
         print(f'\nBuilding container image for {self.compiler} (Ubuntu {self.ubuntu})')
 
-        build_args = ['build',
-                      '--build-arg', f'UBUNTU_VERSION={self.ubuntu}',
-                      '--build-arg', f'UNAME={pwd.getpwuid(os.getuid()).pw_name}',
-                      '--build-arg', f'GNAME={grp.getgrgid(os.getgid()).gr_name}',
-                      '--build-arg', f'UID={os.getuid()}',
-                      '--build-arg', f'GID={os.getgid()}']
+        build_args = ['build', '--build-arg', f'UBUNTU_VERSION={self.ubuntu}']
+        for name, value in ContainerImage._common_build_args.items():
+            build_args += ['--build-arg', f'{name}={value}']
 
         # Only pass the relevant compiler version
         if self.compiler_type == 'gcc':
-            build_args += ['--build-arg', f'GCC_VERSION={self.compiler_version}']
+            compiler_args = ['--build-arg', f'GCC_VERSION={self.compiler_version}']
         else:
-            build_args += ['--build-arg', f'CLANG_VERSION={self.compiler_version}']
+            compiler_args = ['--build-arg', f'CLANG_VERSION={self.compiler_version}']
+        build_args += compiler_args
 
         # Add additional dependencies if specified
         if ContainerImage.additional_deps:
             build_args += ['--build-arg', f'ADDITIONAL_DEPS={ContainerImage.additional_deps}']
 
-        build_args += ['-t', self.tag]
-
+        # The 'compiler' stage of the Dockerfile doesn't depend on the fuzzer,
+        # so it is tagged separately and its layers are shared by the images of all fuzzers
+        stage_args = ['build', '-f', 'Dockerfile.compiler', '--target', 'compiler',
+                      '--build-arg', f'UBUNTU_VERSION={self.ubuntu}'] + compiler_args
+        build_args += ['-f', 'Dockerfile.compiler', '--target', 'fuzzer-final']
+
+        cache_args = []
+        if self.runtime == 'docker':
+            # The inline cache metadata allows to use the images with --cache-from
+            cache_args += ['--build-arg', 'BUILDKIT_INLINE_CACHE=1']
+            build_args += ['--cache-from', self.cache_tag]
+
+        # Reuse the layers of the image previously pushed to the registry
+        if ContainerImage.cache_registry:
+            cache_ref = f'{ContainerImage.cache_registry}:{self.compiler}-cache'
+            print(f'[!] INFO: Pulling {cache_ref} for the build cache')
+            pull_cmd = self.runtime_cmd + ['pull', cache_ref]
+            subprocess.run(pull_cmd, check=False, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+            cache_args += ['--cache-from', cache_ref]
+
+        stage_args += cache_args + ['-t', self.cache_tag]
+        build_args += cache_args + ['-t', self.tag]
+
+        # Not using '-q', since BuildKit writes the progress to stderr.
+        # Keep the output in the log file to make the failures debuggable.
         if self.quiet:
-            print('[!] INFO: Quiet mode, please wait...')
-            build_args += ['-q']
+            print(f'[!] INFO: Quiet mode, writing the build output to {self.log_path}, please wait...')
+            to_log = True
 
         build_dir = ['.']
-        cmd = self.runtime_cmd + build_args + build_dir
-        subprocess.run(cmd, text=True, check=True)
+        with open(self.log_path, 'wb') if to_log else contextlib.nullcontext() as log:
+            for args in (stage_args, build_args):
+                cmd = self.build_cmd() + args + build_dir
+                out = subprocess.run(cmd, check=False,
+                                     stdout=log, stderr=subprocess.STDOUT if log else None)
+                if out.returncode == 0:
+                    continue
+                # The output is hidden in the log file, so point to it
+                if to_log:
+                    sys.exit(f'[-] ERROR: Building the container image for {self.compiler} failed, '
+                             f'see {self.log_path}')
+                out.check_returncode()
         self.id = self.find_id()
-
-    def rm(self):
-        """Try to remove the container image if it exists"""
+        # Only this tag changed, keep the rest of the cache
+        if self.id:
+            ContainerImage._id_cache[self.tag] = self.id
+
+    @classmethod
+    def build_base(cls, ubuntu, to_log=False):
+        """Build the base image with the common packages, which the compiler images are built on"""
+        print(f'\nBuilding base container image for Ubuntu {ubuntu}')
+        log_path = f'build-base-{ubuntu}.log'
+        cmd = cls.build_cmd() + ['build', '-f', 'Dockerfile.base',
+                                 '--build-arg', f'UBUNTU_VERSION={ubuntu}',
+                                 '-t', f'fuzzer-build-base:{ubuntu}', '.']
+        with open(log_path, 'wb') if to_log else contextlib.nullcontext() as log:
+            out = subprocess.run(cmd, check=False,
+                                 stdout=log, stderr=subprocess.STDOUT if log else None)
+        if out.returncode != 0:
+            hint = f', see {log_path}' if to_log else ''
+            sys.exit(f'[-] ERROR: Building the base image for Ubuntu {ubuntu} failed{hint}')
+
+    @classmethod
+    def build_cmd(cls):
+        """Get the runtime command for the 'build' calls"""
+        if cls.runtime != 'docker':
+            return cls.runtime_cmd
+        # Docker 23.0+ uses BuildKit by default, enable it for older versions as well.
+        # Set the variable in the command, sudo resets the environment.
+        return cls.runtime_cmd[:-1] + ['env', 'DOCKER_BUILDKIT=1', cls.runtime_cmd[-1]]
+
+    def check_rm(self):
+        """Check that the container image exists and no containers use it, so it can be removed"""
         if not self.id:
             print(f'\nNo container image for {self.compiler}')
-            return
+            return False
 
         print(f'\nRemoving container image {self.id} for {self.compiler}')
 
-        # We need to get full ID of the container image,
-        # since Podman fails to search containers using a short one
-        get_full_id_cmd = self.runtime_cmd + ['inspect', f'{self.id}', '--format', '{{.ID}}']
-        out = subprocess.run(get_full_id_cmd, text=True, check=True, stdout=subprocess.PIPE)
-        full_id = out.stdout.strip()
-        assert full_id, f'[-] ERROR: Looks like the image {self.id} is already removed'
-
-        get_containers_cmd = self.runtime_cmd + ['ps', '-a', '--filter', f'ancestor={full_id}',
-                                                 '--format', '{{.ID}}']
-        out = subprocess.run(get_containers_cmd, text=True, check=True, stdout=subprocess.PIPE)
-        running_containers = out.stdout.strip()
-
-        if running_containers:
+        if ContainerImage._containers_by_image is None:
+            ContainerImage._load_containers_by_image()
+        if ContainerImage._containers_by_image[self.id]:
             print(f'[!] WARNING: Removing the image {self.id} failed, some containers use it')
-        else:
-            rmi_cmd = self.runtime_cmd + ['rmi', '-f', self.id]
-            subprocess.run(rmi_cmd, text=True, check=True)
-
-        # Update id to reflect the changes
-        self.id = self.find_id()
+            return False
+        return True
 
     def find_id(self):
         """Find the ID of the container image. Return an empty string if it doesn't exist."""
-        find_cmd = self.runtime_cmd + ['images', self.tag, '--format', '{{.ID}}']
+        tags = self._read_repositories()
+        if tags is not None:
+            return short_id(tags.get(self.tag, ''))
+
+        if self.client:
+            try:
+                return short_id(self.client.images.get(self.tag).id)
+            except docker.errors.ImageNotFound:
+                return ''
+
+        find_cmd = self.runtime_cmd + ['images', '--filter', f'reference={self.tag}',
+                                       '--quiet', '--no-trunc']
         out = subprocess.run(find_cmd, text=True, check=False, capture_output=True)
         if out.returncode != 0:
-            sys.exit(f'[-] ERROR: {self.runtime} returned {out.returncode}:\n{out.stderr}')
-        image_id = out.stdout.strip()
-        if image_id:
-            # Fix for the Podman issue (duplicated results)
-            return image_id.split()[0]
-        return image_id
+            runtime_failed(out.returncode, out.stderr)
+        # short_id() takes the first result if Podman prints duplicates
+        return short_id(out.stdout.strip())
+
+    @classmethod
+    def _load_id_cache(cls):
+        """Get the IDs of all images from IMAGE_REPOSITORIES with a single runtime call"""
+        cls._id_cache = {}
+        # The runtime filters the images, so only the needed ones are transferred
+        references = [f'{repo}:*' for repo in IMAGE_REPOSITORIES]
+
+        tags = cls._read_repositories()
+        if tags is not None:
+            for tag, image_id in tags.items():
+                if tag.partition(':')[0] in IMAGE_REPOSITORIES:
+                    cls._id_cache[tag] = short_id(image_id)
+            return
+
+        if cls.client:
+            # The low-level API returns the raw list, images.list() would inspect every image
+            for image in cls.client.api.images(filters={'reference': references}):
+                for tag in image.get('RepoTags') or []:
+                    cls._id_cache.setdefault(tag, short_id(image['Id']))
+            return
+
+        # Several reference filters match any of them
+        filter_args = [arg for ref in references for arg in ('--filter', f'reference={ref}')]
+        list_cmd = cls.runtime_cmd + ['images', *filter_args,
+                                      '--format', '{{.Repository}}:{{.Tag}} {{.ID}}']
+        with subprocess.Popen(list_cmd, text=True,
+                              stdout=subprocess.PIPE, stderr=subprocess.PIPE) as proc:
+            for line in proc.stdout:
+                tag, _, image_id = line.rstrip().partition(' ')
+                if not image_id:
+                    continue
+                # Podman names the local images 'localhost/<repository>'
+                if tag.startswith('localhost/'):
+                    tag = tag[len('localhost/'):]
+                # Keep the first result, Podman may print duplicates
+                cls._id_cache.setdefault(tag, short_id(image_id))
+            stderr = proc.stderr.read()
+        if proc.returncode != 0:
+            runtime_failed(proc.returncode, stderr)
+
+    @classmethod
+    def _read_repositories(cls):
+        """Get Docker's tag-to-ID map without asking the daemon, return None if it's unavailable"""
+        if cls.runtime != 'docker' or not os.access(DOCKER_REPOSITORIES, os.R_OK):
+            return None
+        # The file may belong to another daemon than the one the CLI talks to, check it once per run
+        if cls._repositories_trusted is None:
+            cls._repositories_trusted = repositories_in_use()
+        if not cls._repositories_trusted:
+            return None
+        # The file is read on every call, it is cheap, and the daemon rewrites it on every change
+        try:
+            with open(DOCKER_REPOSITORIES, encoding='utf-8') as f:
+                repositories = json.load(f)['Repositories']
+            return {tag: image_id for repo in repositories.values() for tag, image_id in repo.items()}
+        except (OSError, ValueError, KeyError, AttributeError):
+            return None
+
+    @classmethod
+    def _load_containers_by_image(cls):
+        """Count the containers (including the stopped ones) using each container image"""
+        cls._containers_by_image = Counter()
+        if cls.client:
+            # Sparse listing doesn't inspect every container and provides the image ID
+            containers = cls.client.containers.list(all=True, sparse=True)
+            cls._containers_by_image.update(short_id(c.attrs['ImageID']) for c in containers)
+            return
+
+        ps_cmd = cls.runtime_cmd + ['ps', '-a', '-q', '--no-trunc']
+        out = subprocess.run(ps_cmd, text=True, check=True, stdout=subprocess.PIPE)
+        container_ids = out.stdout.split()
+        if not container_ids:
+            return
+
+        # A single inspect call gives the full image IDs of all containers.
+        # Don't check the return code: some containers may be removed since the ps call.
+        inspect_cmd = cls.runtime_cmd + ['inspect', '--type', 'container',
+                                         '--format', '{{.Image}}'] + container_ids
+        out = subprocess.run(inspect_cmd, text=True, check=False,
+                             stdout=subprocess.PIPE, stderr=subprocess.DEVNULL)
+        cls._containers_by_image.update(short_id(image_id) for image_id in out.stdout.split())
+
+    @classmethod
+    def _remove_ids(cls, image_ids):
+        """Remove the container images, the failures are checked by the caller"""
+        if cls.client:
+            for image_id in image_ids:
+                try:
+                    cls.client.images.remove(image_id, force=True)
+                except docker.errors.APIError as e:
+                    print(f'[!] WARNING: Removing the image {image_id} failed: {e.explanation}')
+            return
 
-    def identify_runtime_cmd(self):
-        """Identify the commands for working with the container runtime"""
+        rmi_cmd = cls.runtime_cmd + ['rmi', '-f'] + image_ids
+        subprocess.run(rmi_cmd, text=True, check=False)
+
+    @classmethod
+    def _connect_client(cls):
+        """Connect to the Docker daemon socket if the Docker SDK is installed"""
+        cls.client = None
+        # Without the access to the socket, the CLI is used via sudo
+        if docker is None or cls.runtime != 'docker' or cls.runtime_cmd[0] == 'sudo':
+            return
+        # docker.from_env() ignores the CLI contexts, it would talk to another daemon than the builds
+        if docker_cli_context() != 'default':
+            return
         try:
-            cmd = [self.runtime, 'ps']
-            out = subprocess.run(cmd, text=True, check=False, capture_output=True)
-            if out.returncode == 0:
-                return [self.runtime]
-            if self.runtime == 'docker' and 'permission denied' in out.stderr:
-                print('[!] INFO: We need "sudo" for working with Docker containers')
-                return ['sudo', self.runtime]
-            sys.exit(f'[-] ERROR: Testing "{" ".join(cmd)}" gives unknown error:\n{out.stderr}')
-        except FileNotFoundError:
-            sys.exit('[-] ERROR: The container runtime is not installed')
-
-
-def build_images(needed_compiler, fuzzer_name):
-    """Build container images for the specified compiler(s)"""
+            client = docker.from_env()
+            client.ping()
+        except docker.errors.DockerException:
+            return
+        cls.client = client
+
+
+@lru_cache(maxsize=None)
+def host_names():
+    """Get the host user and group names, they are looked up through NSS only once"""
+    return pwd.getpwuid(_UID).pw_name, grp.getgrgid(_GID).gr_name
+
+
+def short_id(image_id):
+    """Convert a full or short container image ID to the short form"""
+    if image_id.startswith('sha256:'):
+        image_id = image_id[len('sha256:'):]
+    return image_id[:12]
+
+
+def _build_one(compiler, cfg):
+    """Build a container image in a worker process, return (compiler, image ID, log path)"""
+    for name, value in cfg.items():
+        setattr(ContainerImage, name, value)
+    # Don't share the daemon connection with the parent process
+    ContainerImage._connect_client()
+    # The parent process builds only the missing images, don't load the cache again
+    ContainerImage._id_cache = {}
+
+    image = ContainerImage(compiler)
+    try:
+        image.build(to_log=True)
+    except SystemExit:
+        # The failure and its log are reported in the build summary
+        return compiler, '', image.log_path
+    return compiler, image.id, image.log_path
+
+
+def build_images(needed_compiler, fuzzer_name, jobs=None):
+    """Build container images for the specified compiler(s) using the given number of jobs"""
     if needed_compiler == 'all':
         compilers_to_build = [c for c in COMPILER_METADATA.keys()]
     else:
         compilers_to_build = [needed_compiler]
 
+    # Skip the existing images using a single lookup
+    ensure_runtime_cmd()
+    if ContainerImage._id_cache is None:
+        ContainerImage._load_id_cache()
+    missing = []
     for compiler in compilers_to_build:
-        image = ContainerImage(compiler)
-        image.build()
+        image_id = ContainerImage._id_cache.get(ContainerImage._tag_prefix + compiler)
+        if image_id:
+            print(f'\nThe container image for {fuzzer_name}-{compiler} exists: {image_id}')
+        else:
+            missing.append(compiler)
+    compilers_to_build = missing
+
+    if not compilers_to_build:
+        return
+
+    # BuildKit schedules the bake targets in parallel and shares the common layers itself.
+    # With --jobs, the images are built separately, using the worker pool for N > 1.
+    if jobs is None:
+        if len(compilers_to_build) > 1 and buildx_available():
+            bake_images(compilers_to_build, fuzzer_name)
+            return
+        jobs = 1
+
+    # Build the common part once for every Ubuntu version, all compiler images reuse it
+    for ubuntu in sorted({COMPILER_METADATA[c] for c in compilers_to_build}):
+        ContainerImage.build_base(ubuntu, to_log=jobs > 1 or ContainerImage.quiet)
+
+    if jobs == 1:
+        for compiler in compilers_to_build:
+            image = ContainerImage(compiler)
+            image.build()
+        return
+
+    cfg = {name: getattr(ContainerImage, name) for name in WORKER_ATTRS}
+
+    print(f'\nBuilding {len(compilers_to_build)} container image(s) in {jobs} parallel jobs, '
+          'the build output goes to the log files')
+    with ProcessPoolExecutor(max_workers=jobs) as executor:
+        results = list(executor.map(partial(_build_one, cfg=cfg), compilers_to_build))
+    # Add the images built by the workers
+    for compiler, image_id, _ in results:
+        if image_id:
+            ContainerImage._id_cache[ContainerImage._tag_prefix + compiler] = image_id
+    print_build_summary(results)
+
+
+def print_build_summary(results):
+    """Print the (compiler, image ID, log path) results and exit if some builds failed"""
+    print('\nBuild summary:')
+    fail_cnt = 0
+    for compiler, image_id, log_path in results:
+        if image_id:
+            print(f' [+] {compiler:<10} | {image_id:<12} | {log_path}')
+        else:
+            print(f' [-] {compiler:<10} | {"FAILED":<12} | {log_path}')
+            fail_cnt += 1
+
+    if fail_cnt:
+        sys.exit(f'[-] ERROR: failed to build {fail_cnt} container image(s), see the logs above')
+
+
+def buildx_available():
+    """Check whether the images can be built with 'docker buildx bake'"""
+    if ContainerImage.runtime != 'docker':
+        return False
+    cmd = ContainerImage.runtime_cmd + ['buildx', 'version']
+    out = subprocess.run(cmd, check=False, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    return out.returncode == 0
+
+
+def _hcl_string(value):
+    """Quote a value as an HCL string literal without interpolation"""
+    return json.dumps(value).replace('${', '$${').replace('%{', '%%{')
+
+
+def _hcl_target(name, attrs):
+    """Format an HCL target block with string, list and map attributes"""
+    lines = [f'target {_hcl_string(name)} {{']
+    for key, value in attrs.items():
+        if isinstance(value, dict):
+            lines.append(f'  {key} = {{')
+            lines += [f'    {_hcl_string(k)} = {_hcl_string(v)}' for k, v in value.items()]
+            lines.append('  }')
+        elif isinstance(value, list):
+            lines.append(f'  {key} = [{", ".join(_hcl_string(v) for v in value)}]')
+        else:
+            lines.append(f'  {key} = {_hcl_string(value)}')
+    lines.append('}')
+    return '\n'.join(lines)
+
+
+def _emit_bakefile(compilers, fuzzer, deps):
+    """Generate a bake file with the same images, stages and tags as ContainerImage.build()"""
+    targets = {}
+    for compiler in compilers:
+        ubuntu = COMPILER_METADATA[compiler]
+        compiler_type, compiler_version = compiler.split('-', 1)
+        # Target names can't contain dots
+        name = compiler.replace('.', '_')
+        base = 'base-' + ubuntu.replace('.', '_')
+
+        targets[base] = {'dockerfile': 'Dockerfile.base',
+                         'args': {'UBUNTU_VERSION': ubuntu},
+                         'tags': [f'fuzzer-build-base:{ubuntu}']}
+
+        args = {'UBUNTU_VERSION': ubuntu,
+                f'{compiler_type.upper()}_VERSION': compiler_version,
+                'BUILDKIT_INLINE_CACHE': '1'}
+        common = {'dockerfile': 'Dockerfile.compiler',
+                  # Take the base image from the bake target, not from the image store
+                  'contexts': {f'fuzzer-build-base:{ubuntu}': f'target:{base}'}}
+        if ContainerImage.cache_registry:
+            common['cache-from'] = [f'type=registry,ref={ContainerImage.cache_registry}:{compiler}-cache']
+
+        targets['cache-' + name] = {**common, 'target': 'compiler', 'args': args,
+                                    'tags': [f'fuzzer-build-cache:{compiler}']}
+
+        final_args = {**args, **ContainerImage._common_build_args}
+        if deps:
+            final_args['ADDITIONAL_DEPS'] = deps
+        targets[name] = {**common, 'target': 'fuzzer-final', 'args': final_args,
+                         'tags': [f'fuzzer-build-container:{fuzzer}-{compiler}']}
+
+    group = f'group "default" {{\n  targets = [{", ".join(_hcl_string(t) for t in targets)}]\n}}'
+    return '\n\n'.join([group] + [_hcl_target(n, a) for n, a in targets.items()]) + '\n'
+
+
+def bake_images(compilers, fuzzer_name):
+    """Build the container images for the compilers with a single 'docker buildx bake' call"""
+    print(f'\nBuilding {len(compilers)} container image(s) with "docker buildx bake"')
+    log_path = f'build-{fuzzer_name}-bake.log'
+    to_log = ContainerImage.quiet
+    if to_log:
+        print(f'[!] INFO: Quiet mode, writing the build output to {log_path}, please wait...')
+
+    bakefile = _emit_bakefile(compilers, fuzzer_name, ContainerImage.additional_deps)
+    cmd = ContainerImage.runtime_cmd + ['buildx', 'bake', '-f', '-', '--load']
+    with open(log_path, 'wb') if to_log else contextlib.nullcontext() as log:
+        # The failed targets are reported in the summary
+        subprocess.run(cmd, input=bakefile, text=True, check=False,
+                       stdout=log, stderr=subprocess.STDOUT if log else None)
+
+    ContainerImage._id_cache = None
+    ContainerImage._load_id_cache()
+    print_build_summary([(c, ContainerImage._id_cache.get(ContainerImage._tag_prefix + c, ''),
+                          log_path if to_log else '-') for c in compilers])
 
 
 def remove_images(needed_compiler, fuzzer_name):
@@ -193,10 +568,22 @@ def remove_images(needed_compiler, fuzzer_name):
     else:
         compilers_to_remove = [needed_compiler]
 
+    images = [ContainerImage(c) for c in compilers_to_remove]
+    ids_to_remove = [image.id for image in images if image.check_rm()]
+    if needed_compiler == 'all':
+        ids_to_remove += unused_shared_images(ids_to_remove)
+
+    if ids_to_remove:
+        # Remove all images at once, the failures are counted below
+        ContainerImage._remove_ids(ids_to_remove)
+        ContainerImage._id_cache = None
+        ContainerImage._containers_by_image = None
+        ContainerImage._load_id_cache()
+
     fail_cnt = 0
-    for compiler in compilers_to_remove:
-        image = ContainerImage(compiler)
-        image.rm()
+    for image in images:
+        # Update id to reflect the changes
+        image.id = ContainerImage._id_cache.get(image.tag, '')
         if image.id:
             fail_cnt += 1
 
@@ -204,43 +591,152 @@ def remove_images(needed_compiler, fuzzer_name):
         print(f'\n[!] WARNING: failed to remove {fail_cnt} container image(s), see the log above')
 
 
+def unused_shared_images(removed_ids):
+    """Get the IDs of the cache and base images, which no remaining fuzzer image is built on"""
+    id_cache = ContainerImage._id_cache
+    # The images of all fuzzers share the cache and base images
+    used = set()
+    for tag, image_id in id_cache.items():
+        if tag.startswith('fuzzer-build-container:') and image_id not in removed_ids:
+            used.update(c for c in COMPILER_METADATA if tag.endswith('-' + c))
+    used_ubuntu = {COMPILER_METADATA[c] for c in used}
+
+    # Remove the cache images before the base images they are built on
+    unused_tags = [f'fuzzer-build-cache:{c}' for c in COMPILER_METADATA if c not in used]
+    unused_tags += [f'fuzzer-build-base:{u}' for u in sorted(set(COMPILER_METADATA.values()) - used_ubuntu)]
+
+    if ContainerImage._containers_by_image is None:
+        ContainerImage._load_containers_by_image()
+    unused_ids = []
+    for tag in unused_tags:
+        image_id = id_cache.get(tag)
+        if not image_id or image_id in unused_ids:
+            continue
+        if ContainerImage._containers_by_image[image_id]:
+            print(f'\n[!] WARNING: Keeping the shared image {tag}, some containers use it')
+            continue
+        print(f'\nRemoving the shared image {image_id} ({tag})')
+        unused_ids.append(image_id)
+    return unused_ids
+
+
+def load_runtime_cache():
+    """Load the runtime commands identified by the previous runs"""
+    try:
+        with open(RUNTIME_CACHE, encoding='utf-8') as f:
+            cache = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    return cache if isinstance(cache, dict) else {}
+
+
+def save_runtime_cache(cache):
+    """Save the identified runtime commands, failing to do it is not an error"""
+    try:
+        os.makedirs(os.path.dirname(RUNTIME_CACHE), exist_ok=True)
+        with open(RUNTIME_CACHE, 'w', encoding='utf-8') as f:
+            json.dump(cache, f)
+    except OSError:
+        pass
+
+
+def runtime_failed(returncode, stderr):
+    """Exit with the runtime error and forget the cached runtime command, it may be outdated"""
+    cache = load_runtime_cache()
+    if cache.pop(ContainerImage.runtime, None):
+        save_runtime_cache(cache)
+    sys.exit(f'[-] ERROR: {ContainerImage.runtime} returned {returncode}:\n{stderr}')
+
+
+def identify_runtime_cmd(runtime):
+    """Identify the commands for working with the container runtime"""
+    cmd = [runtime, 'ps']
+    out = subprocess.run(cmd, text=True, check=False, capture_output=True)
+    if out.returncode == 0:
+        return [runtime]
+    if runtime == 'docker' and 'permission denied' in out.stderr:
+        return ['sudo', runtime]
+    sys.exit(f'[-] ERROR: Testing "{" ".join(cmd)}" gives unknown error:\n{out.stderr}')
+
+
+def docker_socket_accessible():
+    """Check without any subprocess that the default Docker socket can be used without sudo"""
+    if os.environ.get('DOCKER_HOST') or docker_cli_context() != 'default':
+        return False
+    return os.access(DOCKER_SOCKET, os.R_OK | os.W_OK)
+
+
+def docker_cli_context():
+    """Get the context the Docker CLI uses, without running the CLI"""
+    if os.environ.get('DOCKER_CONTEXT'):
+        return os.environ['DOCKER_CONTEXT']
+    config_dir = os.environ.get('DOCKER_CONFIG') or os.path.expanduser('~/.docker')
+    try:
+        with open(os.path.join(config_dir, 'config.json'), encoding='utf-8') as f:
+            return json.load(f).get('currentContext') or 'default'
+    except (OSError, ValueError, AttributeError):
+        return 'default'
+
+
+def repositories_in_use():
+    """Check that DOCKER_REPOSITORIES belongs to the daemon the Docker CLI talks to"""
+    # Another daemon (remote, rootless, Docker Desktop) may be selected
+    if os.environ.get('DOCKER_HOST') or docker_cli_context() != 'default':
+        return False
+    # Another storage driver, data-root or the containerd image store leave a stale file behind
+    ensure_runtime_cmd()
+    info_cmd = ContainerImage.runtime_cmd + ['info', '--format', '{{.Driver}} {{.DockerRootDir}}']
+    out = subprocess.run(info_cmd, text=True, capture_output=True, check=False)
+    return out.returncode == 0 and out.stdout.split() == ['overlay2', '/var/lib/docker']
+
+
 def ensure_runtime_cmd():
     """Initialize runtime_cmd if not already set"""
-    if not ContainerImage.runtime_cmd:
-        try:
-            cmd = [ContainerImage.runtime, 'ps']
-            out = subprocess.run(cmd, text=True, check=False, capture_output=True)
-            if out.returncode == 0:
-                ContainerImage.runtime_cmd = [ContainerImage.runtime]
-            elif ContainerImage.runtime == 'docker' and 'permission denied' in out.stderr:
-                print('[!] INFO: We need "sudo" for working with Docker containers')
-                ContainerImage.runtime_cmd = ['sudo', ContainerImage.runtime]
-            else:
-                sys.exit(f'[-] ERROR: Testing "{" ".join(cmd)}" gives unknown error:\n{out.stderr}')
-        except FileNotFoundError:
-            sys.exit('[-] ERROR: The container runtime is not installed')
+    if ContainerImage.runtime_cmd:
+        return
+
+    runtime = ContainerImage.runtime
+    # Looking through PATH is much cheaper than asking the daemon
+    if shutil.which(runtime) is None:
+        sys.exit('[-] ERROR: The container runtime is not installed')
+
+    # Probe the runtime only if the previous runs didn't do it
+    cache = load_runtime_cache()
+    runtime_cmd = cache.get(runtime)
+    # Probe again if the user got the access to the socket (e.g. joined the docker group)
+    if runtime_cmd == ['sudo', runtime] and docker_socket_accessible():
+        runtime_cmd = None
+    if runtime_cmd not in ([runtime], ['sudo', runtime]):
+        runtime_cmd = identify_runtime_cmd(runtime)
+        cache[runtime] = runtime_cmd
+        save_runtime_cache(cache)
+
+    if runtime_cmd[0] == 'sudo':
+        print('[!] INFO: We need "sudo" for working with Docker containers')
+    ContainerImage.runtime_cmd = runtime_cmd
+    ContainerImage._connect_client()
 
 
 def list_all_images():
-    """List all fuzzer-build-container images"""
+    """List all fuzzer-build-container images and the base and cache images they share"""
     ensure_runtime_cmd()
 
-    print('\nAll fuzzer-build-container images:')
+    print('\nAll fuzzer-build-container images and the shared images:')
     print('-' * 70)
     print(f' {"Tag":<50} | {"Image ID":<12}')
     print('-' * 70)
 
-    list_cmd = ContainerImage.runtime_cmd + ['images', '--format', '{{.Repository}}:{{.Tag}} {{.ID}}']
-    out = subprocess.run(list_cmd, text=True, check=True, stdout=subprocess.PIPE)
+    if ContainerImage._id_cache is None:
+        ContainerImage._load_id_cache()
+
+    # Show the fuzzer images first, then the shared ones
+    def repo_order(item):
+        return IMAGE_REPOSITORIES.index(item[0].partition(':')[0])
 
     found = False
-    for line in out.stdout.strip().split('\n'):
-        if line and line.startswith('fuzzer-build-container:'):
-            parts = line.split()
-            tag = parts[0]
-            image_id = parts[1] if len(parts) > 1 else '-'
-            print(f' {tag:<50} | {image_id:<12}')
-            found = True
+    for tag, image_id in sorted(ContainerImage._id_cache.items(), key=repo_order):
+        print(f' {tag:<50} | {image_id:<12}')
+        found = True
 
     if not found:
         print(' (no images found)')
@@ -248,6 +744,16 @@ def list_all_images():
     print('-' * 70)
 
 
+def set_fuzzer_name(fuzzer_name):
+    """Validate the fuzzer name and prepare the image tag prefix"""
+    # The image tag allows only these characters, it can't start with '.' or '-'
+    if not re.fullmatch(r'[A-Za-z0-9_][A-Za-z0-9_.-]*', fuzzer_name):
+        sys.exit(f'[-] ERROR: Invalid fuzzer name "{fuzzer_name}", '
+                 'use letters, digits, "_", "." and "-"')
+    ContainerImage.fuzzer_name = fuzzer_name
+    ContainerImage._tag_prefix = 'fuzzer-build-container:' + fuzzer_name + '-'
+
+
 def main():
     """The main function for managing the images for fuzzer-build-containers"""
     parser = argparse.ArgumentParser(description='Manage container images for fuzzer-build-containers')
@@ -256,17 +762,25 @@ def main():
     parser.add_argument('-p', '--podman', action='store_true',
                         help='force to use the Podman container engine instead of default Docker')
     parser.add_argument('-l', '--list', action='store_true',
-                        help='list all fuzzer-build-container images')
+                        help='list all fuzzer-build-container images and the shared base and cache images')
     parser.add_argument('-b', '--build', nargs='?', const='all', choices=SUPPORTED_COMPILERS,
                         metavar='compiler',
-                        help=f'build a container image for a specific compiler: '
-                             f'{" / ".join(SUPPORTED_COMPILERS)} '
+                        help=f'build a container image for a specific compiler: {_SUPPORTED_HELP} '
                              '("all" builds all images if no compiler is specified)')
     parser.add_argument('-q', '--quiet', action='store_true',
                         help='suppress the container image build output (for using with --build)')
+    parser.add_argument('-j', '--jobs', type=int, nargs='?',
+                        const=max(1, (os.cpu_count() or 2) // 2), metavar='N',
+                        help='build N container images in parallel, writing the build output '
+                             'to per-compiler log files (for using with --build, default: 1, '
+                             'half of the CPU cores if N is not specified; without this option '
+                             'Docker builds several images with "buildx bake" if it is available)')
+    parser.add_argument('--cache-registry', type=str, metavar='REPO',
+                        help='use the "REPO:<compiler>-cache" images as the build cache '
+                             '(optional, for using with --build, Docker only)')
     parser.add_argument('-r', '--remove', nargs='?', const='all', choices=SUPPORTED_COMPILERS,
                         metavar='compiler',
-                        help=f'remove container images for: {" / ".join(SUPPORTED_COMPILERS)} '
+                        help=f'remove container images for: {_SUPPORTED_HELP} '
                              '("all" removes all images if no compiler is specified)')
     parser.add_argument('-f', '--fuzzer', type=str, metavar='NAME',
                         help='fuzzer name (required for --build and --remove operations)')
@@ -283,7 +797,7 @@ def main():
         ContainerImage.runtime = 'docker'
     elif args.podman:
         print('[+] Force to use the Podman container engine')
-        print(f'[!] INFO: Working with Podman images belonging to "{pwd.getpwuid(os.getuid()).pw_name}" (UID {os.getuid()})')
+        print(f'[!] INFO: Working with Podman images belonging to "{host_names()[0]}" (UID {_UID})')
         ContainerImage.runtime = 'podman'
     else:
         print(f'[+] Docker container engine is chosen (default)')
@@ -300,18 +814,35 @@ def main():
     if args.build:
         if not args.fuzzer:
             sys.exit('[-] ERROR: --fuzzer is required for --build operation')
-        ContainerImage.fuzzer_name = args.fuzzer
+        set_fuzzer_name(args.fuzzer)
+        # These build arguments are the same for all images
+        uname, gname = host_names()
+        ContainerImage._common_build_args = {'UNAME': uname, 'GNAME': gname,
+                                             'UID': str(_UID), 'GID': str(_GID)}
 
     if args.remove:
         if not args.fuzzer:
             sys.exit('[-] ERROR: --fuzzer is required for --remove operation')
-        ContainerImage.fuzzer_name = args.fuzzer
+        set_fuzzer_name(args.fuzzer)
 
     if args.quiet:
         if not args.build:
             sys.exit('[-] ERROR: "--quiet" should be used only with the "--build" option')
         ContainerImage.quiet = True
 
+    if args.jobs is not None:
+        if not args.build:
+            sys.exit('[-] ERROR: "--jobs" should be used only with the "--build" option')
+        if args.jobs < 1:
+            sys.exit('[-] ERROR: "--jobs" should be a positive number')
+
+    if args.cache_registry:
+        if not args.build:
+            sys.exit('[-] ERROR: "--cache-registry" should be used only with the "--build" option')
+        if ContainerImage.runtime != 'docker':
+            sys.exit('[-] ERROR: "--cache-registry" is supported only for Docker')
+        ContainerImage.cache_registry = args.cache_registry
+
     if args.deps:
         if not args.build:
             sys.exit('[-] ERROR: "--deps" should be used only with the "--build" option')
@@ -323,7 +854,7 @@ def main():
         sys.exit(0)
 
     if args.build:
-        build_images(args.build, args.fuzzer)
+        build_images(args.build, args.fuzzer, args.jobs)
         list_all_images()
         sys.exit(0)
 
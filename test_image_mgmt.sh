@@ -63,6 +63,28 @@ run_basic_tests() {
 	python3 -m coverage run -a --branch manage_images.py -b clang-7 $RUNTIME_FLAG
 	python3 -m coverage run -a --branch manage_images.py -r $RUNTIME_FLAG
 
+	$DELIMITER
+	echo "Testing parallel image building..."
+	python3 -m coverage run -a --branch manage_images.py -b all -f test -j 2 $RUNTIME_FLAG
+	python3 -m coverage run -a --branch manage_images.py -r all -f test $RUNTIME_FLAG
+
+	$DELIMITER
+	echo "Testing building all images (with \"docker buildx bake\" if it's available)..."
+	python3 -m coverage run -a --branch manage_images.py -b all -f test $RUNTIME_FLAG
+
+	$DELIMITER
+	echo "Testing skipping the existing images..."
+	python3 -m coverage run -a --branch manage_images.py -b all -f test $RUNTIME_FLAG
+	python3 -m coverage run -a --branch manage_images.py -b all -f test -j 2 $RUNTIME_FLAG
+	python3 -m coverage run -a --branch manage_images.py -r all -f test $RUNTIME_FLAG
+
+	if [ "$RUNTIME" = "docker" ]; then
+		$DELIMITER
+		echo "Testing building with the registry cache..."
+		python3 -m coverage run -a --branch manage_images.py -b gcc-12 -f test --cache-registry localhost:5000/fuzzer-build $RUNTIME_FLAG
+		python3 -m coverage run -a --branch manage_images.py -r all -f test $RUNTIME_FLAG
+	fi
+
 	$DELIMITER
 	echo "Testing removing a non-existing image..."
 	python3 -m coverage run -a --branch manage_images.py -r gcc-13 $RUNTIME_FLAG
@@ -116,6 +138,13 @@ run_error_handling_tests() {
 	python3 -m coverage run -a --branch manage_images.py -b -l -r gcc-12 $RUNTIME_FLAG && exit 1
 	python3 -m coverage run -a --branch manage_images.py -b gcc-10 -l -r gcc-12 $RUNTIME_FLAG && exit 1
 	python3 -m coverage run -a --branch manage_images.py -b gcc-10 -l -r gcc-12 -q $RUNTIME_FLAG && exit 1
+	python3 -m coverage run -a --branch manage_images.py -j $RUNTIME_FLAG && exit 1
+	python3 -m coverage run -a --branch manage_images.py -j 2 -l $RUNTIME_FLAG && exit 1
+	python3 -m coverage run -a --branch manage_images.py -j 2 -r -f test $RUNTIME_FLAG && exit 1
+	python3 -m coverage run -a --branch manage_images.py -b gcc-10 -f test -j 0 $RUNTIME_FLAG && exit 1
+	python3 -m coverage run -a --branch manage_images.py -b gcc-10 -f test -j -1 $RUNTIME_FLAG && exit 1
+	python3 -m coverage run -a --branch manage_images.py -l --cache-registry example/cache $RUNTIME_FLAG && exit 1
+	python3 -m coverage run -a --branch manage_images.py -b gcc-10 -f test --cache-registry example/cache -p && exit 1
 
 	$DELIMITER
 	echo "Testing containers with missing GCC tags..."